@@ -0,0 +1,296 @@
+"""Local stand-ins for the OpenAI and Supabase (PostgREST) APIs.
+
+Used by load_test.py to drive the real FastAPI app without touching the
+paid/production upstreams. Each server has a configurable latency and error
+rate so we can see how the API behaves when its dependencies slow down.
+"""
+import asyncio
+import base64
+import random
+import socket
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+EMBEDDING_DIM = 1536
+
+# Queries the fake classifier answers with "CHAT"; everything else is "SEARCH"
+CHAT_QUERIES = [
+    "hi",
+    "hello",
+    "hey there",
+    "thanks!",
+    "thank you, that helps",
+    "who are you?",
+]
+
+SEARCH_QUERIES = [
+    "what did we discuss about the fog nozzle pricing?",
+    "show me links to the latest MeeFog brand guidelines",
+    "when was the last meeting with the MeeFog team?",
+    "summarize the decisions about the website redesign",
+    "who attended the December kickoff call?",
+    "where is the document about the trade show booth?",
+    "what are the open action items for the catalog?",
+    "tell me about the product photography project",
+]
+
+
+@dataclass
+class UpstreamConfig:
+    """Latency (seconds, mean) and error rate (0-1) for one fake upstream, plus call counters.
+
+    The app's openai client retries 5xx responses and main.py swallows most
+    upstream errors, so injected failures rarely surface as failed API requests;
+    the counters show how many were actually served.
+    """
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    requests: int = field(default=0, init=False)
+    injected_errors: int = field(default=0, init=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"requests": self.requests, "injected_errors": self.injected_errors}
+
+    async def simulate(self) -> Optional[JSONResponse]:
+        """Sleep for the configured latency; return an error response if this call should fail"""
+        self.requests += 1
+        delay = self.latency
+        if self.jitter:
+            delay = max(0.0, random.gauss(self.latency, self.jitter))
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and random.random() < self.error_rate:
+            self.injected_errors += 1
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "injected upstream failure", "type": "server_error"}},
+            )
+        return None
+
+
+def _fake_embedding(seed: Any) -> List[float]:
+    rng = random.Random(str(seed))
+    return [rng.uniform(-1, 1) for _ in range(EMBEDDING_DIM)]
+
+
+def _classify(prompt: str) -> str:
+    """Mirror classify_query_type(): CHAT for the known small-talk queries"""
+    marker = 'Query: "'
+    start = prompt.find(marker)
+    if start == -1:
+        return "SEARCH"
+    start += len(marker)
+    query = prompt[start:prompt.find('"', start)]
+    return "CHAT" if query in CHAT_QUERIES else "SEARCH"
+
+
+def _completion_text(prompt: str) -> str:
+    if "Classify this user query" in prompt:
+        return _classify(prompt)
+    if "generate 3 different versions" in prompt:
+        return "\n".join(f"{q} (variation)" for q in random.sample(SEARCH_QUERIES, 3))
+    # Roughly the size of a real sourced answer
+    return ("Based on our **MeeFog** records, here is what I found. " * 20).strip()
+
+
+def create_openai_app(config: UpstreamConfig) -> FastAPI:
+    """Fake of the OpenAI endpoints the API uses: chat completions, embeddings and
+    the model list it calls to warm its connection"""
+    app = FastAPI(title="Fake OpenAI")
+
+    @app.get("/v1/models")
+    async def list_models():
+        error = await config.simulate()
+        if error:
+            return error
+
+        return {"object": "list", "data": [{"id": "fake-model", "object": "model", "created": 0,
+                                            "owned_by": "fake"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        error = await config.simulate()
+        if error:
+            return error
+
+        body = await request.json()
+        prompt = "\n".join(
+            m["content"] if isinstance(m.get("content"), str) else str(m.get("content"))
+            for m in body.get("messages", [])
+        )
+        content = _completion_text(prompt)
+        return {
+            "id": f"chatcmpl-fake-{random.getrandbits(32):x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake-model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        }
+
+    @app.post("/v1/embeddings")
+    async def create_embeddings(request: Request):
+        error = await config.simulate()
+        if error:
+            return error
+
+        body = await request.json()
+        inputs = body.get("input", [])
+        if not isinstance(inputs, list) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+
+        data = []
+        for i, item in enumerate(inputs):
+            vector = _fake_embedding(item)
+            if body.get("encoding_format") == "base64":
+                # The openai client asks for base64 by default and decodes it itself
+                embedding: Any = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode()
+            else:
+                embedding = vector
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "fake-embedding"),
+            "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+        }
+
+    return app
+
+
+def _fake_match(kind: str, index: int) -> Dict[str, Any]:
+    similarity = round(random.uniform(0.25, 0.9), 3)
+    if kind == "meetings":
+        metadata = {
+            "meeting_title": f"MeeFog sync #{index}",
+            "meeting_date": "2025-12-0%d" % (index % 9 + 1),
+            "meeting_url": f"https://example.com/meetings/{index}",
+            "speakers": "Alex, Sam",
+        }
+    else:
+        metadata = {
+            "title": f"MeeFog document #{index}",
+            "date": "2025-11-1%d" % (index % 10),
+            "url": f"https://example.com/documents/{index}",
+        }
+    return {
+        "id": random.randint(1, 10_000),
+        "content": f"Excerpt {index} from the MeeFog {kind} knowledge base. " * 8,
+        "metadata": metadata,
+        "similarity": similarity,
+    }
+
+
+def create_postgrest_app(config: UpstreamConfig) -> FastAPI:
+    """Fake of the Supabase REST endpoints the API uses: match_* RPCs and meefog_meetings"""
+    app = FastAPI(title="Fake PostgREST")
+
+    @app.post("/rest/v1/rpc/{function}")
+    async def rpc(function: str, request: Request):
+        error = await config.simulate()
+        if error:
+            return error
+
+        body = await request.json()
+        kind = "meetings" if "meetings" in function else "documents"
+        return [_fake_match(kind, i) for i in range(int(body.get("match_count", 5)))]
+
+    @app.get("/rest/v1/{table}")
+    async def select(table: str, limit: int = 5):
+        error = await config.simulate()
+        if error:
+            return error
+
+        return [
+            {
+                "meeting_title": f"MeeFog sync #{i}",
+                "meeting_date": f"2025-12-{28 - i:02d}T10:00:00",
+                "meeting_url": f"https://example.com/meetings/{i}",
+                "speakers": "Alex, Sam",
+            }
+            for i in range(limit)
+        ]
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class BackgroundServer:
+    """Run an ASGI app with uvicorn on a daemon thread"""
+
+    def __init__(self, app: FastAPI, port: Optional[int] = None):
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(uvicorn.Config(
+            app, host="127.0.0.1", port=self.port, log_level="warning", access_log=False
+        ))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def start(self, timeout: float = 10.0) -> "BackgroundServer":
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Fake upstream on port {self.port} did not start")
+            time.sleep(0.05)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+class FakeUpstreams:
+    """Both fakes plus the environment variables that point main.py at them"""
+
+    def __init__(self, openai: UpstreamConfig, postgrest: UpstreamConfig):
+        self.configs = {"openai": openai, "postgrest": postgrest}
+        self.openai = BackgroundServer(create_openai_app(openai))
+        self.postgrest = BackgroundServer(create_postgrest_app(postgrest))
+
+    def start(self) -> "FakeUpstreams":
+        self.openai.start()
+        self.postgrest.start()
+        return self
+
+    def stop(self):
+        self.openai.stop()
+        self.postgrest.stop()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Requests served and failures injected so far, per upstream"""
+        return {name: config.stats() for name, config in self.configs.items()}
+
+    def env(self) -> Dict[str, str]:
+        return {
+            "OPENAI_API_KEY": "sk-fake",
+            "OPENAI_API_BASE": f"{self.openai.url}/v1",
+            "SUPABASE_URL": self.postgrest.url,
+            # supabase-py only checks that the key looks like a JWT
+            "SUPABASE_SERVICE_KEY": "fake.fake.fake",
+        }
+
+    def __enter__(self) -> "FakeUpstreams":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,582 @@
+"""Closed-loop load test for the MeeFog RAG API.
+
+Starts local fake OpenAI and PostgREST servers (see fake_upstreams.py), boots
+the real app under uvicorn with each requested worker count, and sweeps
+concurrency levels. Every virtual user sends a request, waits for the answer
+and immediately sends the next one, so throughput flattens out once the
+workers are saturated.
+
+Example:
+    python load_test.py --workers 1,2,4 --concurrency 1,4,8,16,32 \\
+        --duration 20 --search-ratio 0.7 --conversations zipf:50 \\
+        --openai-latency 0.4 --postgrest-latency 0.03
+
+Reports throughput and p50/p95/p99 per level, the saturation point per worker
+count, and how `conversation_memories` grows over a run (measured in-process,
+since each uvicorn worker keeps its own dict).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+import types
+from dataclasses import dataclass, field, asdict
+from typing import Optional, List, Dict, Any
+
+import httpx
+
+from fake_upstreams import (
+    CHAT_QUERIES,
+    SEARCH_QUERIES,
+    FakeUpstreams,
+    UpstreamConfig,
+    free_port,
+)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+ENDPOINTS = ("chat", "documents", "meetings")
+
+
+def parse_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Parse "chat=0.6,documents=0.2,meetings=0.2" into endpoint weights"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{name}' (expected one of {ENDPOINTS})")
+        mix[name] = float(weight)
+    if not sum(mix.values()) > 0:
+        raise argparse.ArgumentTypeError("Endpoint mix weights must sum to more than 0")
+    return mix
+
+
+class ConversationIds:
+    """Conversation-id distribution: none, unique, uniform:K or zipf:K"""
+
+    def __init__(self, spec: str, rng: random.Random):
+        self.spec = spec
+        self.rng = rng
+        kind, _, size = spec.partition(":")
+        self.kind = kind
+        self.size = int(size) if size else 0
+        self._counter = 0
+        self._ids = [f"conv-{i}" for i in range(self.size)]
+        self._cum_weights: List[float] = []
+
+        if kind in ("uniform", "zipf"):
+            if self.size < 1:
+                raise ValueError(f"'{spec}' needs a conversation count, e.g. {kind}:50")
+            if kind == "zipf":
+                total = 0.0
+                for i in range(self.size):
+                    total += 1.0 / (i + 1)
+                    self._cum_weights.append(total)
+        elif kind not in ("none", "unique"):
+            raise ValueError(f"Unknown conversation distribution '{spec}'")
+
+    def next(self) -> Optional[str]:
+        if self.kind == "none":
+            return None  # main.py falls back to the shared "default" conversation
+        if self.kind == "unique":
+            self._counter += 1
+            return f"conv-u{self._counter}"
+        if self.kind == "uniform":
+            return self.rng.choice(self._ids)
+        return self.rng.choices(self._ids, cum_weights=self._cum_weights)[0]
+
+
+class Workload:
+    """Picks the next request according to the endpoint mix and CHAT/SEARCH ratio"""
+
+    def __init__(self, mix: Dict[str, float], search_ratio: float, conversations: str, seed: int):
+        self.rng = random.Random(seed)
+        self.endpoints = list(mix)
+        self.weights = [mix[e] for e in self.endpoints]
+        self.search_ratio = search_ratio
+        self.conversations = ConversationIds(conversations, self.rng)
+
+    def next(self) -> tuple[str, str, Dict[str, Any]]:
+        """Return (label, method+path, kwargs for httpx)"""
+        endpoint = self.rng.choices(self.endpoints, weights=self.weights)[0]
+        if endpoint == "chat":
+            is_search = self.rng.random() < self.search_ratio
+            query = self.rng.choice(SEARCH_QUERIES if is_search else CHAT_QUERIES)
+            payload: Dict[str, Any] = {"query": query}
+            conversation_id = self.conversations.next()
+            if conversation_id:
+                payload["conversation_id"] = conversation_id
+            label = "chat:search" if is_search else "chat:chat"
+            return label, "/api/chat", {"method": "POST", "json": payload}
+
+        query = self.rng.choice(SEARCH_QUERIES)
+        return endpoint, f"/api/{endpoint}", {"method": "GET", "params": {"q": query, "limit": 10}}
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile (values need not be sorted); None when there are no samples"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def percentile_ms(values: List[float], pct: float) -> Optional[float]:
+    value = percentile(values, pct)
+    return value * 1000 if value is not None else None
+
+
+@dataclass
+class LevelResult:
+    workers: int
+    concurrency: int
+    duration: float
+    warmup: float = 0.0
+    requests: int = 0
+    errors: int = 0
+    throughput: float = 0.0
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+    rss_mb: Optional[float] = None
+    by_label: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # Calls the fake upstreams served during the level (warm-up and drain included)
+    upstream: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+
+async def run_level(base_url: str, workers: int, concurrency: int, duration: float,
+                    warmup: float, workload: Workload, timeout: float) -> LevelResult:
+    """Drive `concurrency` closed-loop users through a warm-up and a `duration` window.
+
+    Warm-up lasts at least `warmup` seconds and until every user has completed
+    one request, so it stretches with the round-trip time at high concurrency.
+    Throughput counts completions that land inside the window, whenever they
+    were sent. Once the window closes users stop sending, in-flight requests
+    drain, and every request that finished after warm-up contributes latency.
+    """
+    # (label, done, latency, ok) for every completed request
+    completions: List[tuple[str, float, float, bool]] = []
+    warmed_up = 0
+    all_warm = asyncio.Event()
+    stopping = False
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+
+        async def user():
+            nonlocal warmed_up
+            first = True
+            while not stopping:
+                label, path, kwargs = workload.next()
+                sent = time.perf_counter()
+                try:
+                    response = await client.request(url=path, **kwargs)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                done = time.perf_counter()
+                completions.append((label, done, done - sent, ok))
+                if first:
+                    first = False
+                    warmed_up += 1
+                    if warmed_up == concurrency:
+                        all_warm.set()
+
+        start = time.perf_counter()
+        users = [asyncio.create_task(user()) for _ in range(concurrency)]
+        await asyncio.sleep(warmup)
+        try:
+            await asyncio.wait_for(all_warm.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass  # some user is stuck past the request timeout; measure anyway
+        measure_from = time.perf_counter()
+        await asyncio.sleep(duration)
+        stop_at = time.perf_counter()
+        stopping = True
+        await asyncio.gather(*users)
+
+    latencies: Dict[str, List[float]] = {}
+    ok_in_window = errors = 0
+    for label, done, latency, ok in completions:
+        if done < measure_from:
+            continue
+        in_window = done <= stop_at
+        if ok:
+            latencies.setdefault(label, []).append(latency)
+            if in_window:
+                ok_in_window += 1
+        elif in_window:
+            errors += 1
+
+    all_latencies = [lat for values in latencies.values() for lat in values]
+    result = LevelResult(workers=workers, concurrency=concurrency, duration=stop_at - measure_from,
+                         warmup=measure_from - start)
+    result.requests = ok_in_window + errors
+    result.errors = errors
+    result.throughput = ok_in_window / result.duration
+    result.p50_ms = percentile_ms(all_latencies, 50)
+    result.p95_ms = percentile_ms(all_latencies, 95)
+    result.p99_ms = percentile_ms(all_latencies, 99)
+    result.by_label = {
+        label: {
+            "count": len(values),
+            "p50_ms": percentile_ms(values, 50),
+            "p95_ms": percentile_ms(values, 95),
+            "p99_ms": percentile_ms(values, 99),
+        }
+        for label, values in sorted(latencies.items())
+    }
+    if not all_latencies:
+        print(f"WARNING: {workers} worker(s), {concurrency} users: no successful requests "
+              f"were measured ({errors} errors)")
+    return result
+
+
+def _rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def _children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+class ApiProcess:
+    """`uvicorn main:app --workers N` pointed at the fake upstreams"""
+
+    def __init__(self, workers: int, env: Dict[str, str], verbose: bool = False):
+        self.workers = workers
+        self.verbose = verbose
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = {**os.environ, **env}
+        self.proc: Optional[subprocess.Popen] = None
+
+    def start(self, timeout: float = 60.0):
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--workers", str(self.workers),
+             "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR,
+            env=self.env,
+            stdout=None if self.verbose else subprocess.DEVNULL,
+            stderr=None if self.verbose else subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"API exited with code {self.proc.returncode} (rerun with --verbose)")
+            try:
+                if httpx.get(f"{self.url}/ready", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"API with {self.workers} worker(s) did not become ready")
+
+    def rss_mb(self) -> Optional[float]:
+        """Total resident memory of the uvicorn process tree (Linux only)"""
+        if not self.proc or not os.path.exists(f"/proc/{self.proc.pid}"):
+            return None
+        pids = [self.proc.pid]
+        pids += [child for pid in list(pids) for child in _children(pid)]
+        try:
+            return sum(_rss_kb(pid) for pid in pids) / 1024
+        except OSError:
+            return None
+
+    def stop(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+
+def find_saturation(levels: List[LevelResult], threshold: float) -> Optional[LevelResult]:
+    """First level after which adding users gains less than `threshold` throughput"""
+    if not levels:
+        return None
+    best = levels[0]
+    for level in levels[1:]:
+        if level.throughput < best.throughput * (1 + threshold):
+            return best
+        best = level
+    return best
+
+
+def upstream_delta(before: Dict[str, Dict[str, int]], after: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+    return {
+        name: {key: after[name][key] - before[name][key] for key in after[name]}
+        for name in after
+    }
+
+
+def deep_sizeof(root: Any) -> int:
+    """sys.getsizeof of `root` plus everything it references, each object counted once.
+
+    Classes, modules and functions are shared code, not per-conversation data,
+    so they are not followed.
+    """
+    skip = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+    seen = set()
+    stack = [root]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, skip):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        else:
+            if hasattr(obj, "__dict__"):
+                stack.append(vars(obj))
+            # pydantic models keep fields_set/extra/private in slots
+            for cls in type(obj).__mro__:
+                for slot in cls.__dict__.get("__slots__", ()):
+                    if slot not in ("__dict__", "__weakref__"):
+                        stack.append(getattr(obj, slot, None))
+    return total
+
+
+class _ErrorCounter(logging.Filter):
+    """Drops the app's log records, counting the ERROR ones"""
+
+    def __init__(self):
+        super().__init__()
+        self.errors = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            self.errors += 1
+        return False
+
+
+async def measure_memory(env: Dict[str, str], requests: int, concurrency: int,
+                         workload: Workload, checkpoints: int = 5) -> List[Dict[str, Any]]:
+    """Run `workload` in-process and sample the size of conversation_memories.
+
+    Use a chat-only mix; the search endpoints never touch conversation_memories.
+    """
+    os.environ.update(env)
+    sys.path.insert(0, BACKEND_DIR)
+    import main  # noqa: E402 - needs the fake upstream env first
+
+    # The app's per-request logs (including swallowed [SEARCH]/[CLASSIFY] errors)
+    # would drown the report; count the errors and print one line instead
+    logging.getLogger().setLevel(logging.WARNING)
+    app_errors = _ErrorCounter()
+    main.logger.addFilter(app_errors)
+    samples = []
+    step = max(1, requests // checkpoints)
+
+    # ASGITransport does not run the lifespan, so enter it ourselves
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app), \
+            httpx.AsyncClient(transport=transport, base_url="http://api", timeout=120) as client:
+        await main.wait_until_ready()
+        main.conversation_memories.clear()
+
+        sent = 0
+        while sent < requests:
+            batch = min(step, requests - sent)
+            queue = list(range(batch))
+
+            async def user():
+                while queue:
+                    queue.pop()
+                    _, path, kwargs = workload.next()
+                    await client.request(url=path, **kwargs)
+
+            await asyncio.gather(*(user() for _ in range(concurrency)))
+            sent += batch
+
+            memories = main.conversation_memories
+            messages = sum(
+                len(m.load_memory_variables({}).get("chat_history", [])) for m in memories.values()
+            )
+            samples.append({
+                "requests": sent,
+                "conversations": len(memories),
+                "messages": messages,
+                "memories_mb": deep_sizeof(memories) / 1024 / 1024,
+            })
+
+    main.logger.removeFilter(app_errors)
+    if app_errors.errors:
+        print(f"NOTE: the app logged {app_errors.errors} errors during the memory run "
+              f"(upstream failures it handled itself)")
+    return samples
+
+
+def check_tiktoken():
+    """OpenAIEmbeddings tokenizes with tiktoken, which downloads its encoding on first use.
+
+    Without it every embedding call fails inside search_both(), which swallows the
+    error, so SEARCH traffic would silently skip the vector search.
+    """
+    try:
+        import tiktoken
+        tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"WARNING: tiktoken encoding unavailable ({type(e).__name__}); SEARCH queries will "
+              f"skip vector search. Pre-fetch it or point TIKTOKEN_CACHE_DIR at a cached copy.")
+
+
+def _fmt(value: Optional[float], spec: str) -> str:
+    return format(value, spec) if value is not None else "-"
+
+
+def print_levels(levels: List[LevelResult]):
+    print(f"{'workers':>7} {'users':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'errors':>6} {'rss MB':>8}")
+    for r in levels:
+        print(f"{r.workers:>7} {r.concurrency:>5} {r.throughput:>8.2f} {_fmt(r.p50_ms, '.0f'):>8} "
+              f"{_fmt(r.p95_ms, '.0f'):>8} {_fmt(r.p99_ms, '.0f'):>8} {r.errors:>6} "
+              f"{_fmt(r.rss_mb, '.1f'):>8}")
+
+
+def print_upstream(levels: List[LevelResult]):
+    print(f"{'workers':>7} {'users':>5} {'openai calls':>12} {'injected':>8} "
+          f"{'postgrest calls':>15} {'injected':>8}")
+    for r in levels:
+        openai = r.upstream.get("openai", {})
+        postgrest = r.upstream.get("postgrest", {})
+        print(f"{r.workers:>7} {r.concurrency:>5} {openai.get('requests', 0):>12} "
+              f"{openai.get('injected_errors', 0):>8} {postgrest.get('requests', 0):>15} "
+              f"{postgrest.get('injected_errors', 0):>8}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=parse_list, default=[1, 2, 4], help="uvicorn worker counts, e.g. 1,2,4")
+    parser.add_argument("--concurrency", type=parse_list, default=[1, 2, 4, 8, 16, 32],
+                        help="closed-loop users per level, e.g. 1,4,16")
+    parser.add_argument("--duration", type=float, default=15.0, help="measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=2.0,
+                        help="minimum unmeasured seconds before each level; extended until every user "
+                             "has completed one request")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("chat=0.6,documents=0.2,meetings=0.2"),
+                        help="endpoint weights, e.g. chat=0.6,documents=0.2,meetings=0.2")
+    parser.add_argument("--search-ratio", type=float, default=0.7,
+                        help="share of /api/chat queries that classify as SEARCH (rest are CHAT)")
+    parser.add_argument("--conversations", default="uniform:50",
+                        help="conversation ids: none, unique, uniform:K or zipf:K")
+    parser.add_argument("--openai-latency", type=float, default=0.3)
+    parser.add_argument("--openai-jitter", type=float, default=0.05)
+    parser.add_argument("--openai-error-rate", type=float, default=0.0)
+    parser.add_argument("--postgrest-latency", type=float, default=0.02)
+    parser.add_argument("--postgrest-jitter", type=float, default=0.005)
+    parser.add_argument("--postgrest-error-rate", type=float, default=0.0)
+    parser.add_argument("--knee-threshold", type=float, default=0.1,
+                        help="throughput gain below which a level counts as saturated")
+    parser.add_argument("--memory-requests", type=int, default=300,
+                        help="in-process /api/chat requests for the memory growth check (0 to skip)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="show the API's own logs")
+    parser.add_argument("--json", dest="json_path", help="also write the full report to this file")
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(
+        openai=UpstreamConfig(args.openai_latency, args.openai_jitter, args.openai_error_rate),
+        postgrest=UpstreamConfig(args.postgrest_latency, args.postgrest_jitter, args.postgrest_error_rate),
+    )
+
+    check_tiktoken()
+
+    report: Dict[str, Any] = {"config": {k: v for k, v in vars(args).items() if k not in ("json_path", "verbose")}}
+    levels: List[LevelResult] = []
+    saturation: Dict[int, Optional[Dict[str, Any]]] = {}
+
+    with upstreams:
+        print(f"Fake OpenAI at {upstreams.openai.url}, fake PostgREST at {upstreams.postgrest.url}")
+
+        for workers in args.workers:
+            api = ApiProcess(workers, upstreams.env(), args.verbose)
+            print(f"\n--- {workers} worker(s) ---")
+            api.start()
+            try:
+                worker_levels = []
+                for concurrency in args.concurrency:
+                    workload = Workload(args.mix, args.search_ratio, args.conversations, args.seed)
+                    before = upstreams.stats()
+                    result = asyncio.run(run_level(
+                        api.url, workers, concurrency, args.duration, args.warmup, workload, args.timeout
+                    ))
+                    result.upstream = upstream_delta(before, upstreams.stats())
+                    result.rss_mb = api.rss_mb()
+                    worker_levels.append(result)
+                    print_levels([result])
+            finally:
+                api.stop()
+
+            levels.extend(worker_levels)
+            knee = find_saturation(worker_levels, args.knee_threshold)
+            saturation[workers] = asdict(knee) if knee else None
+
+        memory_samples = []
+        if args.memory_requests > 0:
+            workload = Workload({"chat": 1.0}, args.search_ratio, args.conversations, args.seed)
+            memory_samples = asyncio.run(measure_memory(
+                upstreams.env(), args.memory_requests, max(args.concurrency), workload
+            ))
+
+    print("\n=== Summary ===")
+    print_levels(levels)
+
+    # Injected failures are mostly retried by the openai client or swallowed by
+    # main.py, so they show up as extra latency rather than in the errors column
+    print("\nUpstream calls per level (warm-up and drain included):")
+    print_upstream(levels)
+
+    print("\nSaturation point per worker count:")
+    for workers, knee in saturation.items():
+        if knee and not knee["throughput"]:
+            print(f"  {workers} worker(s): no successful requests")
+        elif knee:
+            print(f"  {workers} worker(s): {knee['concurrency']} users, "
+                  f"{knee['throughput']:.2f} req/s, p99 {_fmt(knee['p99_ms'], '.0f')} ms")
+
+    if memory_samples:
+        print(f"\nconversation_memories growth ({args.conversations}, single process):")
+        print(f"{'requests':>8} {'convs':>6} {'messages':>8} {'memories MB':>12}")
+        for s in memory_samples:
+            print(f"{s['requests']:>8} {s['conversations']:>6} {s['messages']:>8} {s['memories_mb']:>12.3f}")
+
+    report["levels"] = [asdict(level) for level in levels]
+    report["saturation"] = saturation
+    report["memory"] = memory_samples
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -1,18 +1,23 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, TYPE_CHECKING
+from contextlib import asynccontextmanager
+import asyncio
 import os
 import logging
+import time
 from datetime import datetime
 from dotenv import load_dotenv
 
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain.memory import ConversationBufferWindowMemory
-from langchain_core.messages import HumanMessage, AIMessage
-from supabase import create_client, Client
+# LangChain and Supabase are imported lazily in initialize() - they dominate cold start
+if TYPE_CHECKING:
+    from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+    from langchain_core.runnables import Runnable
+    from langchain.memory import ConversationBufferWindowMemory
+    from langchain_core.messages import HumanMessage, AIMessage
+    from supabase import Client
 
 load_dotenv()
 
@@ -27,7 +32,51 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="MeeFog RAG API", version="1.0.0")
+# Clients and compiled chains, created once by initialize()
+supabase: Optional["Client"] = None
+embeddings: Optional["OpenAIEmbeddings"] = None
+llm: Optional["ChatOpenAI"] = None
+chat_chain: Optional["Runnable"] = None
+knowledge_chain: Optional["Runnable"] = None
+multi_query_chain: Optional["Runnable"] = None
+
+# LangChain classes used per request, bound by initialize()
+_Memory: Optional[type["ConversationBufferWindowMemory"]] = None
+_HumanMessage: Optional[type["HumanMessage"]] = None
+_AIMessage: Optional[type["AIMessage"]] = None
+
+startup_timings: Dict[str, float] = {}
+
+def _on_initialized(task: asyncio.Task):
+    """Log a failed initialize(); /ready keeps reporting it so the healthcheck fails"""
+    if task.cancelled() or task.exception() is None:
+        return
+    logger.critical(f"[STARTUP] Initialization failed: {task.exception()}")
+
+async def wait_until_ready():
+    """Wait for startup to finish; 503 if there is no startup task or startup failed"""
+    task: Optional[asyncio.Task] = getattr(app.state, "startup_task", None)
+    if task is None:
+        raise HTTPException(status_code=503, detail="Service is starting")
+    try:
+        await asyncio.shield(task)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Service failed to start: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Initialize in a worker thread so /health answers while we warm up
+    task = asyncio.create_task(asyncio.to_thread(initialize))
+    task.add_done_callback(_on_initialized)
+    app.state.startup_task = task
+    try:
+        yield
+    finally:
+        # The task belongs to this event loop; a later lifespan starts its own
+        app.state.startup_task = None
+        task.cancel()
+
+app = FastAPI(title="MeeFog RAG API", version="1.0.0", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -38,31 +87,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize clients
-supabase: Client = create_client(
-    os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_SERVICE_KEY")
-)
-
-embeddings = OpenAIEmbeddings(
-    model=os.getenv("EMBEDDING_MODEL", "text-embedding-3-small"),
-    openai_api_key=os.getenv("OPENAI_API_KEY")
-)
-
-llm = ChatOpenAI(
-    model=os.getenv("OPENAI_MODEL", "gpt-4.1-mini"),
-    temperature=0.2,
-    openai_api_key=os.getenv("OPENAI_API_KEY")
-)
 bot_name = "Archie"
 
 # Initialize conversation memory (stores last 12 messages = 6 exchanges)
 conversation_memories = {}  # Store memories per conversation_id
 
-def get_or_create_memory(conversation_id: str) -> ConversationBufferWindowMemory:
+def get_or_create_memory(conversation_id: str) -> "ConversationBufferWindowMemory":
     """Get existing memory or create new one for conversation"""
     if conversation_id not in conversation_memories:
-        conversation_memories[conversation_id] = ConversationBufferWindowMemory(
+        conversation_memories[conversation_id] = _Memory(
             k=6,  # Keep last 6 exchanges (12 messages total)
             return_messages=True,
             memory_key="chat_history"
@@ -281,14 +314,94 @@ Original question: {question}
 Provide these alternative questions separated by newlines. Do not number them or add bullet points, just clean text lines.
 """
 
+def initialize():
+    """Import LangChain/Supabase, create the clients and compile the prompt chains"""
+    global supabase, embeddings, llm, chat_chain, knowledge_chain, multi_query_chain
+    global _Memory, _HumanMessage, _AIMessage
+    started = time.perf_counter()
+
+    from openai import DefaultHttpxClient
+    from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain.memory import ConversationBufferWindowMemory
+    from langchain_core.messages import HumanMessage, AIMessage
+    from supabase import create_client
+
+    _Memory, _HumanMessage, _AIMessage = ConversationBufferWindowMemory, HumanMessage, AIMessage
+
+    imported = time.perf_counter()
+    startup_timings["imports_s"] = round(imported - started, 3)
+    logger.info(f"[STARTUP] Imports loaded in {imported - started:.2f}s")
+
+    supabase = create_client(
+        os.getenv("SUPABASE_URL"),
+        os.getenv("SUPABASE_SERVICE_KEY")
+    )
+
+    # One connection pool for chat and embeddings, so warm_up() can open it for both
+    openai_http_client = DefaultHttpxClient()
+
+    embeddings = OpenAIEmbeddings(
+        model=os.getenv("EMBEDDING_MODEL", "text-embedding-3-small"),
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=openai_http_client
+    )
+
+    llm = ChatOpenAI(
+        model=os.getenv("OPENAI_MODEL", "gpt-4.1-mini"),
+        temperature=0.2,
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=openai_http_client
+    )
+
+    # Parse each prompt template once instead of on every request
+    parser = StrOutputParser()
+    chat_chain = ChatPromptTemplate.from_template(CHAT_PROMPT) | llm | parser
+    knowledge_chain = ChatPromptTemplate.from_template(KNOWLEDGE_PROMPT) | llm | parser
+    multi_query_chain = ChatPromptTemplate.from_template(MULTI_QUERY_PROMPT) | llm | parser
+
+    created = time.perf_counter()
+    startup_timings["clients_s"] = round(created - imported, 3)
+
+    warm_up()
+
+    startup_timings["warm_up_s"] = round(time.perf_counter() - created, 3)
+    startup_timings["total_s"] = round(time.perf_counter() - started, 3)
+    logger.info(f"[STARTUP] Ready in {startup_timings['total_s']:.2f}s | {startup_timings}")
+
+def warm_up():
+    """Pay one-off first-use costs now rather than on the first request (no paid API calls)"""
+    # Open the OpenAI and Supabase connections (DNS, TCP, TLS) with free requests
+    try:
+        llm.root_client.models.list()
+    except Exception as e:
+        logger.warning(f"[STARTUP] Could not warm OpenAI connection: {e}")
+    try:
+        supabase.table("meefog_meetings").select("id").limit(1).execute()
+    except Exception as e:
+        logger.warning(f"[STARTUP] Could not warm Supabase connection: {e}")
+
+    # embed_query() loads the tiktoken encoding on first use (downloaded if not cached)
+    try:
+        import tiktoken
+        try:
+            tiktoken.encoding_for_model(embeddings.tiktoken_model_name or embeddings.model)
+        except KeyError:
+            tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"[STARTUP] Could not preload tiktoken encoding: {e}")
+
+    # Exercise prompt formatting and the memory path once
+    chat_chain.first.invoke({"bot_name": BOT_NAME, "chat_history": "", "query": "hi"})
+    format_memory_for_prompt(get_or_create_memory("__warm_up__"))
+    conversation_memories.pop("__warm_up__", None)
+
 def generate_query_variations(query: str) -> List[str]:
     """Generate multiple perspectives of the user query"""
     logger.info(f"[MULTI-QUERY] Generating variations for: '{query}'")
     try:
-        prompt = ChatPromptTemplate.from_template(MULTI_QUERY_PROMPT)
-        chain = prompt | llm | StrOutputParser()
-        
-        response = chain.invoke({"question": query})
+        response = multi_query_chain.invoke({"question": query})
         
         # Split by newlines and clean up
         variations = [line.strip() for line in response.split('\n') if line.strip()]
@@ -477,6 +590,17 @@ Content: {content}
 async def health_check():
     return {"status": "ok", "message": "Ready Artwork MeeFog RAG API is running"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until clients are created and warmed up"""
+    task: Optional[asyncio.Task] = getattr(app.state, "startup_task", None)
+    if task is None or not task.done():
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    if task.cancelled() or task.exception():
+        error = "cancelled" if task.cancelled() else str(task.exception())
+        return JSONResponse(status_code=503, content={"status": "error", "message": error})
+    return {"status": "ready", "startup": startup_timings}
+
 def format_history(history: List[ChatMessage], max_messages: int = 15) -> str:
     """Format conversation history for context"""
     if not history:
@@ -492,7 +616,7 @@ def format_history(history: List[ChatMessage], max_messages: int = 15) -> str:
     
     return "\n".join(formatted)
 
-def format_memory_for_prompt(memory: ConversationBufferWindowMemory) -> str:
+def format_memory_for_prompt(memory: "ConversationBufferWindowMemory") -> str:
     """Format LangChain memory messages for prompt"""
     messages = memory.load_memory_variables({}).get("chat_history", [])
     if not messages:
@@ -500,9 +624,9 @@ def format_memory_for_prompt(memory: ConversationBufferWindowMemory) -> str:
     
     formatted = []
     for msg in messages:
-        if isinstance(msg, HumanMessage):
+        if isinstance(msg, _HumanMessage):
             formatted.append(f"User: {msg.content}")
-        elif isinstance(msg, AIMessage):
+        elif isinstance(msg, _AIMessage):
             formatted.append(f"{BOT_NAME}: {msg.content}")
     
     return "\n".join(formatted)
@@ -512,6 +636,7 @@ async def chat(request: ChatRequest):
     """Main chat endpoint - RAG pipeline with LangChain conversation memory"""
     logger.info(f"{'='*60}")
     logger.info(f"[CHAT] New request: '{request.query}'")
+    await wait_until_ready()
     
     # Get or create conversation memory
     conversation_id = request.conversation_id or "default"
@@ -528,9 +653,7 @@ async def chat(request: ChatRequest):
         # Handle pure chat queries without database search
         if query_type == "CHAT":
             logger.info(f"[CHAT] Pure conversational query - no search needed")
-            prompt = ChatPromptTemplate.from_template(CHAT_PROMPT)
-            chain = prompt | llm | StrOutputParser()
-            answer = chain.invoke({
+            answer = chat_chain.invoke({
                 "bot_name": BOT_NAME,
                 "chat_history": history_text,
                 "query": request.query
@@ -602,10 +725,7 @@ async def chat(request: ChatRequest):
         
         # Generate response with or without context
         logger.info(f"[LLM] Generating response...")
-        prompt = ChatPromptTemplate.from_template(KNOWLEDGE_PROMPT)
-        chain = prompt | llm | StrOutputParser()
-        
-        answer = chain.invoke({
+        answer = knowledge_chain.invoke({
             "bot_name": BOT_NAME,
             "chat_history": history_text,
             "context": context if context.strip() else "No relevant information found in the knowledge base.",
@@ -650,12 +770,14 @@ async def chat(request: ChatRequest):
 @app.get("/api/documents")
 async def search_docs(q: str, limit: int = 10):
     """Search documents endpoint"""
+    await wait_until_ready()
     docs, _ = search_both(q, limit)
     return {"results": docs}
 
 @app.get("/api/meetings") 
 async def search_meets(q: str, limit: int = 10):
     """Search meetings endpoint"""
+    await wait_until_ready()
     _, meetings = search_both(q, limit)
     return {"results": meetings}
 
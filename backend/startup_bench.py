@@ -0,0 +1,149 @@
+"""Cold-start benchmark for the MeeFog RAG API.
+
+Measures, over several fresh processes pointed at the local fake upstreams
+(see fake_upstreams.py):
+
+- import: time for `import main` in a new interpreter
+- health: process spawn -> first 200 from /health
+- ready: process spawn -> first 200 from /ready (clients created and warmed up)
+- first/second request: latency of the first two /api/chat calls once ready
+
+Example:
+    python startup_bench.py --runs 5 --json startup.json
+    python startup_bench.py --runs 5 --compare startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Optional, Dict, Any, List
+
+import httpx
+
+from fake_upstreams import FakeUpstreams, UpstreamConfig, free_port
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+METRICS = ("import_s", "health_s", "ready_s", "first_request_s", "second_request_s")
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def measure_import(env: Dict[str, str]) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _wait_for(url: str, proc: subprocess.Popen, started: float, timeout: float) -> float:
+    """Poll `url` until it returns 200; return seconds since `started`"""
+    while time.perf_counter() - started < timeout:
+        if proc.poll() is not None:
+            raise RuntimeError(f"API exited with code {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def measure_cold_start(env: Dict[str, str], query: str, timeout: float) -> Dict[str, Any]:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        result: Dict[str, Any] = {"health_s": _wait_for(f"{url}/health", proc, started, timeout)}
+        result["ready_s"] = _wait_for(f"{url}/ready", proc, started, timeout)
+        result["startup"] = httpx.get(f"{url}/ready").json().get("startup", {})
+
+        for key in ("first_request_s", "second_request_s"):
+            sent = time.perf_counter()
+            response = httpx.post(f"{url}/api/chat", json={"query": query}, timeout=timeout)
+            response.raise_for_status()
+            result[key] = time.perf_counter() - sent
+        return result
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    summary = {}
+    for metric in METRICS:
+        values = [r[metric] for r in runs if metric in r]
+        if values:
+            summary[metric] = {"median": statistics.median(values), "min": min(values), "max": max(values)}
+    return summary
+
+
+def print_summary(summary: Dict[str, Dict[str, float]], baseline: Optional[Dict[str, Dict[str, float]]]):
+    header = f"{'metric':<18} {'median ms':>10} {'min ms':>8} {'max ms':>8}"
+    print(header + (f" {'vs baseline':>12}" if baseline else ""))
+    for metric, stats in summary.items():
+        line = (f"{metric:<18} {stats['median'] * 1000:>10.0f} "
+                f"{stats['min'] * 1000:>8.0f} {stats['max'] * 1000:>8.0f}")
+        if baseline and metric in baseline:
+            delta = (stats["median"] - baseline[metric]["median"]) * 1000
+            line += f" {delta:>+10.0f}ms"
+        print(line)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per measurement")
+    parser.add_argument("--query", default="what did we discuss about the fog nozzle pricing?",
+                        help="query for the first/second request (a SEARCH query exercises embeddings)")
+    parser.add_argument("--openai-latency", type=float, default=0.0)
+    parser.add_argument("--postgrest-latency", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    parser.add_argument("--compare", help="print deltas against a previous --json result")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["summary"]
+
+    upstreams = FakeUpstreams(
+        openai=UpstreamConfig(latency=args.openai_latency),
+        postgrest=UpstreamConfig(latency=args.postgrest_latency),
+    )
+    with upstreams:
+        env = {**os.environ, **upstreams.env()}
+        runs = []
+        for i in range(args.runs):
+            run = {"import_s": measure_import(env)}
+            run.update(measure_cold_start(env, args.query, args.timeout))
+            runs.append(run)
+            print(f"run {i + 1}/{args.runs}: import {run['import_s'] * 1000:.0f} ms, "
+                  f"ready {run['ready_s'] * 1000:.0f} ms, first request {run['first_request_s'] * 1000:.0f} ms")
+
+    summary = summarize(runs)
+    print()
+    print_summary(summary, baseline)
+    print(f"\nIn-process startup breakdown (last run): {runs[-1].get('startup')}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"config": {"runs": args.runs, "query": args.query}, "summary": summary, "runs": runs},
+                      f, indent=2)
+        print(f"Results written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main_cli()